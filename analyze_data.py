@@ -1,34 +1,47 @@
 # -*- coding: utf-8 -*-
-import pandas as pd
 import sys
+from data_loader import read_excel
+
+# 既定では先頭行のみ表示し、--full 指定時は全行を表示
+FULL_OUTPUT = '--full' in sys.argv[1:]
+PREVIEW_ROWS = 50
+
+
+def print_data(df):
+    """データを表示（行数が多い場合は先頭のみ）"""
+    if FULL_OUTPUT or len(df) <= PREVIEW_ROWS:
+        print(df.to_string())
+    else:
+        print(df.head(PREVIEW_ROWS).to_string())
+        print(f"... ({len(df) - PREVIEW_ROWS} more rows, --full で全行表示)")
+
 
 # Excel files analysis
 print("=" * 60)
 print("Mathematical Optimization_sampling_2026.xlsx の分析")
 print("=" * 60)
 
-xl1 = pd.ExcelFile('Mathematical Optimization_sampling_2026.xlsx')
-print(f"シート名: {xl1.sheet_names}")
+# 全シートを1回の読み込みで取得
+sheets1 = read_excel('Mathematical Optimization_sampling_2026.xlsx', sheet_name=None)
+print(f"シート名: {list(sheets1.keys())}")
 
-for sheet in xl1.sheet_names:
-    df = pd.read_excel(xl1, sheet_name=sheet)
+for sheet, df in sheets1.items():
     print(f"\n--- {sheet} シート ---")
     print(f"列名: {list(df.columns)}")
     print(f"行数: {len(df)}")
     print("\nデータ:")
-    print(df.to_string())
+    print_data(df)
 
 print("\n" + "=" * 60)
 print("sample.xlsx の分析")
 print("=" * 60)
 
-xl2 = pd.ExcelFile('sample.xlsx')
-print(f"シート名: {xl2.sheet_names}")
+sheets2 = read_excel('sample.xlsx', sheet_name=None)
+print(f"シート名: {list(sheets2.keys())}")
 
-for sheet in xl2.sheet_names:
-    df = pd.read_excel(xl2, sheet_name=sheet)
+for sheet, df in sheets2.items():
     print(f"\n--- {sheet} シート ---")
     print(f"列名: {list(df.columns)}")
     print(f"行数: {len(df)}")
     print("\nデータ:")
-    print(df.to_string())
+    print_data(df)
@@ -4,10 +4,12 @@ Flask Webアプリケーション
 サンプリング業務人員配置最適化システム
 """
 
-from flask import Flask, render_template, jsonify, request, send_file
+from flask import Flask, render_template, request, send_file
 import json
 import io
+import orjson
 from datetime import datetime
+import numpy as np
 import pandas as pd
 from optimizer import run_optimization, SamplingOptimizer
 from data_loader import load_all_data, get_schedule_by_date
@@ -27,6 +29,15 @@ cached_data = None
 cached_results = None
 
 
+def ojson(obj, status: int = 200):
+    """orjsonでJSONレスポンスを生成（jsonifyと同じくキーはソートする）"""
+    return app.response_class(
+        orjson.dumps(obj, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY),
+        status=status,
+        mimetype='application/json'
+    )
+
+
 def get_cached_data():
     """データをキャッシュから取得または読み込み"""
     global cached_data
@@ -35,7 +46,10 @@ def get_cached_data():
         cached_data = {
             'persons': persons_df,
             'tasks': tasks_df,
-            'schedule': schedule_df
+            'schedule': schedule_df,
+            'schedule_by_date': get_schedule_by_date(schedule_df),
+            'persons_records': persons_df.to_dict('records'),
+            'persons_summary': persons_df[['name', 'skill', 'notes']].to_dict('records')
         }
     return cached_data
 
@@ -50,10 +64,10 @@ def index():
 def get_data():
     """初期データを取得"""
     data = get_cached_data()
-    schedule_by_date = get_schedule_by_date(data['schedule'])
+    schedule_by_date = data['schedule_by_date']
     
     dates = sorted(schedule_by_date.keys())
-    persons = data['persons'][['name', 'skill', 'notes']].to_dict('records')
+    persons = data['persons_summary']
     
     date_summary = [
         {
@@ -64,7 +78,7 @@ def get_data():
         for date, tasks in sorted(schedule_by_date.items())
     ]
     
-    return jsonify({
+    return ojson({
         'dates': dates,
         'persons': persons,
         'schedule': date_summary
@@ -77,37 +91,44 @@ def optimize():
     global cached_results
     
     try:
-        result = run_optimization(OPTIMIZATION_FILE, SCHEDULE_FILE)
+        data = get_cached_data()
+        # Webワーカー内ではプロセスプールを生成せず逐次実行する
+        result = run_optimization(
+            persons_df=data['persons'],
+            tasks_df=data['tasks'],
+            schedule_df=data['schedule'],
+            max_workers=1
+        )
         cached_results = result['results']
         
-        return jsonify({
+        return ojson({
             'success': True,
             'results': cached_results,
             'dates': result['schedule_dates']
         })
     except Exception as e:
-        return jsonify({
+        return ojson({
             'success': False,
             'error': str(e)
-        }), 500
+        }, 500)
 
 
 @app.route('/api/optimize/day/<date_str>', methods=['POST'])
 def optimize_day(date_str):
     """特定の日の最適化を実行"""
     data = get_cached_data()
-    schedule_by_date = get_schedule_by_date(data['schedule'])
+    schedule_by_date = data['schedule_by_date']
     
     if date_str not in schedule_by_date:
-        return jsonify({
+        return ojson({
             'success': False,
             'error': f'Date {date_str} not found in schedule'
-        }), 404
+        }, 404)
     
     optimizer = SamplingOptimizer(data['persons'], data['tasks'])
     result = optimizer.optimize_day(date_str, schedule_by_date[date_str])
     
-    return jsonify({
+    return ojson({
         'success': True,
         'date': date_str,
         'results': result
@@ -120,20 +141,20 @@ def get_schedule_for_date(date_str):
     global cached_results
     
     data = get_cached_data()
-    schedule_by_date = get_schedule_by_date(data['schedule'])
+    schedule_by_date = data['schedule_by_date']
     
     if date_str not in schedule_by_date:
-        return jsonify({
+        return ojson({
             'success': False,
             'error': f'Date {date_str} not found'
-        }), 404
+        }, 404)
     
     tasks = schedule_by_date[date_str]
     assignments = {}
     if cached_results and date_str in cached_results:
         assignments = cached_results[date_str]
     
-    return jsonify({
+    return ojson({
         'success': True,
         'date': date_str,
         'tasks': tasks,
@@ -145,8 +166,8 @@ def get_schedule_for_date(date_str):
 def get_persons():
     """作業者リストを取得"""
     data = get_cached_data()
-    persons = data['persons'].to_dict('records')
-    return jsonify({
+    persons = data['persons_records']
+    return ojson({
         'success': True,
         'persons': persons
     })
@@ -158,34 +179,46 @@ def download_results():
     global cached_results
     
     if not cached_results:
-        return jsonify({
+        return ojson({
             'success': False,
             'error': '最適化が実行されていません。先に最適化を実行してください。'
-        }), 400
-    
-    # データを整形
-    rows = []
-    for date_str in sorted(cached_results.keys()):
-        date_obj = datetime.strptime(date_str, '%Y-%m-%d')
-        weekday_names = ['月', '火', '水', '木', '金', '土', '日']
-        weekday = weekday_names[date_obj.weekday()]
-        
-        for task_name, persons in cached_results[date_str].items():
-            rows.append({
-                '日付': date_str,
-                '曜日': weekday,
-                '業務名': task_name,
-                '担当者1': persons[0] if len(persons) > 0 else '',
-                '担当者2': persons[1] if len(persons) > 1 else '',
-                '担当者3': persons[2] if len(persons) > 2 else '',
-                '担当者4': persons[3] if len(persons) > 3 else '',
-            })
-    
-    df = pd.DataFrame(rows)
+        }, 400)
+    
+    # データを整形（日付・業務・担当者リストの組を列方向にまとめて変換）
+    sorted_dates = sorted(cached_results.keys())
+    triples = [
+        (date_str, task_name, persons)
+        for date_str in sorted_dates
+        for task_name, persons in cached_results[date_str].items()
+    ]
+    df = pd.DataFrame(triples, columns=['日付', '業務名', '_persons'])
+    
+    # 曜日は日付ごとに1回だけ算出する
+    weekday_names = ['月', '火', '水', '木', '金', '土', '日']
+    weekdays = pd.to_datetime(sorted_dates, format='%Y-%m-%d').weekday
+    weekday_by_date = {date_str: weekday_names[w] for date_str, w in zip(sorted_dates, weekdays)}
+    df.insert(1, '曜日', df['日付'].map(weekday_by_date))
+    
+    person_columns = ['担当者1', '担当者2', '担当者3', '担当者4']
+    padded = np.array(
+        [list(p[:4]) + [''] * (4 - len(p[:4])) for p in df['_persons']],
+        dtype=object
+    ).reshape(len(df), len(person_columns))
+    df[person_columns] = padded
+    df = df.drop(columns='_persons')
     
     # Excelファイルをメモリに書き込み
+    # xlsxwriterで書き込む（未インストールならopenpyxl）
+    # to_excelは列順にセルを書くため、行単位で確定するconstant_memoryモードは使えない
     output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
+    try:
+        writer = pd.ExcelWriter(output, engine='xlsxwriter', engine_kwargs={'options': {
+            'strings_to_formulas': False,
+            'strings_to_urls': False
+        }})
+    except ImportError:
+        writer = pd.ExcelWriter(output, engine='openpyxl')
+    with writer:
         df.to_excel(writer, sheet_name='人員配置表', index=False)
     output.seek(0)
     
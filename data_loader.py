@@ -4,9 +4,17 @@
 Excelファイルからサンプリング業務データを読み込む
 """
 
+import functools
+import glob
+import hashlib
+import inspect
+import os
+import pickle
+import tempfile
+import weakref
 import pandas as pd
 from datetime import datetime, timedelta
-from typing import Dict, List, Tuple, Any
+from typing import Callable, Dict, List, Tuple, Any
 
 
 def excel_serial_to_date(serial: int) -> datetime:
@@ -16,6 +24,97 @@ def excel_serial_to_date(serial: int) -> datetime:
     return base_date + timedelta(days=serial - 366)
 
 
+def read_excel(filepath: str, **kwargs) -> pd.DataFrame:
+    """
+    Excelファイルを読み込む
+    python-calamineが利用可能ならcalamineエンジンを使用し、
+    未インストールの場合はopenpyxlにフォールバックする
+    """
+    try:
+        return pd.read_excel(filepath, engine='calamine', **kwargs)
+    except ImportError:
+        return pd.read_excel(filepath, engine='openpyxl', **kwargs)
+
+
+# 読み込み処理（列名変換・型変換など）を変更した際に上げるキャッシュのバージョン
+CACHE_VERSION = 1
+
+
+def _write_atomic(path: str, write: Callable[[str], None]) -> None:
+    """一時ファイルに書き込んでから置き換える（複数プロセスからの同時書き込み対策）"""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    os.close(fd)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def cache_df(cache_dir: str = '.cache') -> Callable:
+    """
+    読み込み結果のDataFrameをparquetファイルにキャッシュするデコレータ
+    (ファイルの絶対パス, 更新時刻, 読み込み関数とそのソース, CACHE_VERSION, pandasのバージョン)
+    をキーとし、Excelファイルや読み込み関数が更新されるとキャッシュは自動的に無効になる
+    型が混在する列などparquetに保存できないDataFrameはpickleで保存する
+    同じファイル・読み込み関数の古いキャッシュは新しいキャッシュの書き込み時に削除する
+    """
+    def decorator(func: Callable[[str], pd.DataFrame]) -> Callable[[str], pd.DataFrame]:
+        try:
+            source = inspect.getsource(func)
+        except (OSError, TypeError):
+            source = ''
+        source_hash = hashlib.sha1(source.encode('utf-8')).hexdigest()
+        
+        @functools.wraps(func)
+        def wrapper(filepath: str) -> pd.DataFrame:
+            abspath = os.path.abspath(filepath)
+            # ファイル名の先頭は (ファイル, 読み込み関数) ごとに固定し、古いキャッシュの削除に使う
+            prefix = hashlib.sha1(f"{abspath}|{func.__name__}".encode('utf-8')).hexdigest()[:16]
+            key = (f"{abspath}|{os.path.getmtime(abspath)}|{func.__name__}|{source_hash}|"
+                   f"{CACHE_VERSION}|{pd.__version__}")
+            digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+            parquet_path = os.path.join(cache_dir, f"{prefix}_{digest}.parquet")
+            pickle_path = os.path.join(cache_dir, f"{prefix}_{digest}.pkl")
+            
+            try:
+                if os.path.exists(parquet_path):
+                    return pd.read_parquet(parquet_path, engine='pyarrow')
+                if os.path.exists(pickle_path):
+                    return pd.read_pickle(pickle_path)
+            except (ImportError, OSError, ValueError, pickle.UnpicklingError):
+                pass
+            
+            df = func(filepath)
+            
+            try:
+                os.makedirs(cache_dir, exist_ok=True)
+                try:
+                    _write_atomic(parquet_path, lambda path: df.to_parquet(
+                        path, engine='pyarrow', compression='zstd'))
+                    written_path = parquet_path
+                except (ImportError, TypeError, ValueError):
+                    # pyarrow未インストールや型混在列（例: 地区に数値と文字列）はpickleで保存
+                    _write_atomic(pickle_path, df.to_pickle)
+                    written_path = pickle_path
+                
+                # 同じファイル・読み込み関数の古いキャッシュを削除
+                for old_path in glob.glob(os.path.join(cache_dir, f"{prefix}_*")):
+                    if old_path != written_path and not old_path.endswith('.tmp'):
+                        try:
+                            os.remove(old_path)
+                        except OSError:
+                            pass  # 他プロセスが削除済み
+            except OSError:
+                pass  # 書き込めない環境ではキャッシュしない
+            
+            return df
+        return wrapper
+    return decorator
+
+
+@cache_df()
 def load_person_data(filepath: str) -> pd.DataFrame:
     """
     作業者データを読み込む
@@ -24,7 +123,7 @@ def load_person_data(filepath: str) -> pd.DataFrame:
         DataFrame with columns: name, priority, skill, trouble, personality, 
                                strength, ship, driving, navigation, notes
     """
-    df = pd.read_excel(filepath, sheet_name='person')
+    df = read_excel(filepath, sheet_name='person')
     
     # 列名を英語に変換（日本語列名の場合のみ）
     column_mapping = {
@@ -54,6 +153,7 @@ def load_person_data(filepath: str) -> pd.DataFrame:
     return df
 
 
+@cache_df()
 def load_task_database(filepath: str) -> pd.DataFrame:
     """
     業務データベースを読み込む
@@ -61,7 +161,7 @@ def load_task_database(filepath: str) -> pd.DataFrame:
     Returns:
         DataFrame with task information
     """
-    df = pd.read_excel(filepath, sheet_name='database')
+    df = read_excel(filepath, sheet_name='database')
     
     # 列名を英語に変換（日本語列名の場合のみ）
     column_mapping = {
@@ -83,27 +183,24 @@ def load_task_database(filepath: str) -> pd.DataFrame:
         df = df.rename(columns=existing_cols)
     
     # 所要時間の範囲表記を数値に変換（例: "0.5～3" -> 1.75）
-    def parse_duration(val):
-        if pd.isna(val):
-            return 1.0
-        if isinstance(val, str):
-            if '～' in val or '~' in val:
-                parts = val.replace('～', '~').split('~')
-                try:
-                    return (float(parts[0]) + float(parts[1])) / 2
-                except:
-                    return 1.0
-            try:
-                return float(val)
-            except:
-                return 1.0
-        return float(val)
+    # 数値化できない値・欠損は1.0とする
+    # 全角数字（例: "２", "１～３"）も読めるよう文字列はNFKC正規化してから変換する
+    duration = df['duration']
+    is_str = duration.map(lambda val: isinstance(val, str))
+    text = duration.where(is_str).astype('string').str.normalize('NFKC').str.replace('～', '~', regex=False)
+    ranged = text.str.contains('~', regex=False).fillna(False).astype(bool)
     
-    df['duration'] = df['duration'].apply(parse_duration)
+    parts = text.str.split('~', n=2, expand=True).reindex(columns=[0, 1])
+    range_avg = (pd.to_numeric(parts[0], errors='coerce') + pd.to_numeric(parts[1], errors='coerce')) / 2
+    values = duration.astype(object).where(~is_str, text.astype(object))
+    scalar = pd.to_numeric(values.where(~ranged), errors='coerce')
+    
+    df['duration'] = range_avg.where(ranged, scalar).fillna(1.0).astype(float)
     
     return df
 
 
+@cache_df()
 def load_schedule(filepath: str) -> pd.DataFrame:
     """
     スケジュールデータを読み込む
@@ -111,54 +208,50 @@ def load_schedule(filepath: str) -> pd.DataFrame:
     Returns:
         DataFrame with columns: date, task_name
     """
-    df = pd.read_excel(filepath, sheet_name='Sheet1', header=None)
+    df = read_excel(filepath, sheet_name='Sheet1', header=None)
     df.columns = ['date_serial', 'task_name']
     
-    # 日付に変換
-    df['date'] = df['date_serial'].apply(excel_serial_to_date)
+    # 日付に変換（日付書式のセルは読み込み時点でdatetimeになっている）
+    if pd.api.types.is_datetime64_any_dtype(df['date_serial']):
+        df['date'] = df['date_serial']
+    else:
+        df['date'] = df['date_serial'].apply(excel_serial_to_date)
     df['date_str'] = df['date'].dt.strftime('%Y-%m-%d')
     
     return df
 
 
+# get_schedule_by_date の結果キャッシュ: id(schedule_df) -> (行数, 結果)
+_schedule_by_date_cache: Dict[int, Tuple[int, Dict[str, List[str]]]] = {}
+
+
 def get_schedule_by_date(schedule_df: pd.DataFrame) -> Dict[str, List[str]]:
     """
     日付ごとにタスクをグループ化
+    読み込み後のスケジュールは変更されないため、DataFrameごとに結果をキャッシュする
     
     Returns:
         Dict[date_str, List[task_name]]
     """
-    result = {}
-    for _, row in schedule_df.iterrows():
-        date_str = row['date_str']
-        if date_str not in result:
-            result[date_str] = []
-        result[date_str].append(row['task_name'])
+    key = id(schedule_df)
+    cached = _schedule_by_date_cache.get(key)
+    if cached is not None and cached[0] == len(schedule_df):
+        return cached[1]
+    
+    result = schedule_df.groupby('date_str', sort=True)['task_name'].apply(list).to_dict()
+    
+    _schedule_by_date_cache[key] = (len(schedule_df), result)
+    weakref.finalize(schedule_df, _schedule_by_date_cache.pop, key, None)
     return result
 
 
-def match_task_to_database(task_name: str, database_df: pd.DataFrame) -> Dict[str, Any]:
+def unregistered_task(task_name: str) -> Dict[str, Any]:
     """
-    スケジュールのタスク名をデータベースとマッチング
-    部分一致で最も類似度の高いものを返す
+    マスタ未登録業務のデフォルト値を返す（マスタ未登録は1名配置）
     """
-    task_name_clean = task_name.strip()
-    
-    # 完全一致を試行
-    exact_match = database_df[database_df['task_name'] == task_name_clean]
-    if len(exact_match) > 0:
-        return exact_match.iloc[0].to_dict()
-    
-    # 部分一致を試行
-    for _, row in database_df.iterrows():
-        db_name = str(row['task_name']).strip()
-        if db_name in task_name_clean or task_name_clean in db_name:
-            return row.to_dict()
-    
-    # マッチしない場合はデフォルト値を返す（マスタ未登録は1名配置）
     return {
         'task_id': 0,
-        'task_name': task_name_clean,
+        'task_name': task_name,
         'area': '不明',
         'required_workers': 1,  # マスタ未登録業務は1名
         'required_skill': 3,
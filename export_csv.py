@@ -1,18 +1,49 @@
 # -*- coding: utf-8 -*-
+import csv
+import io
 import pandas as pd
+from data_loader import read_excel
 
-# Mathematical Optimization_sampling_2026.xlsx
-xl1 = pd.ExcelFile('Mathematical Optimization_sampling_2026.xlsx')
-for sheet in xl1.sheet_names:
-    df = pd.read_excel(xl1, sheet_name=sheet)
-    df.to_csv(f'data_{sheet}.csv', index=False, encoding='utf-8-sig')
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+except ImportError:  # pyarrowが無い環境ではpandasで書き出す
+    pa = None
+
+
+def write_csv(df, path):
+    """DataFrameをBOM付きUTF-8のCSVに書き出す（Excelで開けるように）"""
+    # pyarrowは小数・日時・真偽値の書式がpandasと異なるため、整数と文字列の列のみの場合に使う
+    arrow_compatible = all(
+        pd.api.types.is_integer_dtype(df[col]) or pd.api.types.is_string_dtype(df[col])
+        for col in df.columns
+    )
+    if pa is not None and arrow_compatible:
+        # 引用符なしで書き出す（pandasと同じ出力）。型が混在する列や、
+        # 区切り文字・改行を含み引用符が必要な値がある場合はpandasで書き出す
+        try:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            header = io.StringIO()
+            csv.writer(header, lineterminator='\n').writerow(df.columns)
+            with open(path, 'wb') as f:
+                f.write(('\ufeff' + header.getvalue()).encode('utf-8'))
+                pacsv.write_csv(table, f, pacsv.WriteOptions(include_header=False, quoting_style='none'))
+            return
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            pass
+    df.to_csv(path, index=False, encoding='utf-8-sig')
+
+
+# Mathematical Optimization_sampling_2026.xlsx（全シートを1回の読み込みで取得）
+sheets1 = read_excel('Mathematical Optimization_sampling_2026.xlsx', sheet_name=None)
+for sheet, df in sheets1.items():
+    write_csv(df, f'data_{sheet}.csv')
     print(f'Exported: data_{sheet}.csv')
 
 # sample.xlsx  
-xl2 = pd.ExcelFile('sample.xlsx')
-for sheet in xl2.sheet_names:
-    df = pd.read_excel(xl2, sheet_name=sheet)
-    df.to_csv(f'schedule_{sheet}.csv', index=False, encoding='utf-8-sig')
+sheets2 = read_excel('sample.xlsx', sheet_name=None)
+for sheet, df in sheets2.items():
+    write_csv(df, f'schedule_{sheet}.csv')
     print(f'Exported: schedule_{sheet}.csv')
 
 print("Done!")
@@ -1,19 +1,73 @@
 # -*- coding: utf-8 -*-
 """
 最適化エンジンモジュール
-PuLPを使用してサンプリング業務の人員配置を最適化
+HiGHS (highspy) またはPuLPを使用してサンプリング業務の人員配置を最適化
 """
 
+import os
 import pulp
+import numpy as np
 import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
 from typing import Dict, List, Tuple, Any, Optional
+try:
+    import highspy
+except ImportError:  # highspyが無い環境ではPuLP (CBC) で求解する
+    highspy = None
+
 from data_loader import (
     load_all_data, 
     get_schedule_by_date, 
-    match_task_to_database
+    unregistered_task
 )
 
 
+# マッチングスコアに使う業務の列と未設定時のデフォルト値
+TASK_SCORE_COLUMNS = [
+    ('required_skill', 3),
+    ('required_strength', 3),
+    ('ship_work', 1),
+    ('navigation_required', 1),
+]
+
+
+def match_score_matrix(person_attrs: np.ndarray, task_attrs: np.ndarray) -> np.ndarray:
+    """
+    作業者×業務のマッチングスコア行列を一括計算
+    スコアが高いほど適任（calculate_match_score もこの関数で計算する）
+    
+    Args:
+        person_attrs: (n_persons, 4) 技量・体力・船上・操縦
+        task_attrs: (n_tasks, 4) 必要技量・必要体力・船上・操船
+        
+    Returns:
+        (n_persons, n_tasks) のスコア行列
+    """
+    p = person_attrs.astype(np.float32)
+    t = task_attrs.astype(np.float32)
+    
+    # 技量マッチング (最重要)
+    skill_diff = p[:, 0:1] - t[:, 0:1].T
+    score = np.where(skill_diff >= 0, 30 + skill_diff * 5, skill_diff * 20)
+    
+    # 体力マッチング
+    strength_diff = p[:, 1:2] - t[:, 1:2].T
+    score += np.where(strength_diff >= 0, 20 + strength_diff * 3, strength_diff * 15)
+    
+    # 船上作業能力（船上作業が必要な業務のみ）
+    ship_diff = p[:, 2:3] - t[:, 2:3].T
+    ship_score = np.where(ship_diff >= 0, 15 + ship_diff * 2, ship_diff * 10)
+    score += np.where(t[:, 2:3].T >= 3, ship_score, 0)
+    
+    # 操船能力（操船が必要な業務のみ）
+    nav = p[:, 3:4]
+    nav_score = np.where(nav > 0, 10 + nav * 2, -30)
+    score += np.where(t[:, 3:4].T >= 3, nav_score, 0)
+    
+    return score.astype(np.float32)
+
+
 class SamplingOptimizer:
     """サンプリング業務人員配置最適化クラス"""
     
@@ -22,81 +76,144 @@ class SamplingOptimizer:
         self.tasks = tasks_df
         self.person_names = persons_df['name'].tolist()
         
-    def calculate_match_score(self, person: pd.Series, task: Dict) -> float:
-        """
-        作業者と業務のマッチングスコアを計算
-        スコアが高いほど適任
-        """
-        score = 0.0
+        # 作業者属性を列ごとの配列で保持（行アクセスでSeriesを生成しないため）
+        self.p_names = persons_df['name'].to_numpy()
+        self.p_notes = persons_df['notes'].fillna('').astype(str).to_numpy() \
+            if 'notes' in persons_df.columns else np.full(len(persons_df), '', dtype=object)
+        self.p_skill = persons_df['skill'].to_numpy(dtype=np.float32)
+        self.p_strength = persons_df['strength'].to_numpy(dtype=np.float32)
+        self.p_ship = persons_df['ship'].to_numpy(dtype=np.float32)
+        self.p_navigation = persons_df['navigation'].to_numpy(dtype=np.float32)
+        self.p_monday_tuesday_only = np.array(['月火のみ' in notes for notes in self.p_notes], dtype=bool)
+        self.p_analysis_priority = np.array(['分析優先' in notes for notes in self.p_notes], dtype=bool)
         
-        # 技量マッチング (最重要)
-        skill_diff = person['skill'] - task.get('required_skill', 3)
-        if skill_diff >= 0:
-            score += 30 + skill_diff * 5  # 要件を満たしていればボーナス
-        else:
-            score -= abs(skill_diff) * 20  # 不足はペナルティ
+        # 業務名マッチング用の索引（完全一致は先頭の行を優先）
+        self._task_records = tasks_df.to_dict('records')
+        self._task_idx_by_name = {}
+        for t_global, record in enumerate(self._task_records):
+            self._task_idx_by_name.setdefault(record['task_name'], t_global)
+        self._task_name_arr = tasks_df['task_name'].astype(str).str.strip().to_numpy(dtype=str)
         
-        # 体力マッチング
-        strength_diff = person['strength'] - task.get('required_strength', 3)
-        if strength_diff >= 0:
-            score += 20 + strength_diff * 3
-        else:
-            score -= abs(strength_diff) * 15
+        # 業務名 -> データベース行番号のキャッシュ（同じ業務名は日をまたいで繰り返し現れる）
+        self._match_cache: Dict[str, int] = {}
         
-        # 船上作業能力
-        if task.get('ship_work', 1) >= 3:  # 船上作業が必要
-            ship_diff = person['ship'] - task.get('ship_work', 1)
-            if ship_diff >= 0:
-                score += 15 + ship_diff * 2
-            else:
-                score -= abs(ship_diff) * 10
+        # 作業者×業務のマッチングスコア行列を事前計算
+        self._p_attrs = np.column_stack([self.p_skill, self.p_strength, self.p_ship, self.p_navigation])
+        self._score_mat = match_score_matrix(self._p_attrs, self._task_attrs(self._task_records))
+    
+    @staticmethod
+    def _task_attrs(task_records: List[Dict]) -> np.ndarray:
+        """スコア計算用の業務属性行列 (n_tasks, 4)"""
+        return np.array(
+            [[task.get(col, default) for col, default in TASK_SCORE_COLUMNS] for task in task_records],
+            dtype=np.float32
+        ).reshape(len(task_records), len(TASK_SCORE_COLUMNS))
+    
+    def _match_index(self, task_name_clean: str) -> int:
+        """
+        業務データベースの行番号を返す（マッチしない場合は-1）
+        完全一致を優先し、なければ部分一致で最初に見つかったものを返す
+        """
+        if task_name_clean not in self._match_cache:
+            self._match_cache[task_name_clean] = self._find_task_index(task_name_clean)
+        return self._match_cache[task_name_clean]
+    
+    def _find_task_index(self, task_name_clean: str) -> int:
+        """業務データベースを検索して行番号を返す（マッチしない場合は-1）"""
+        # 完全一致を試行
+        if task_name_clean in self._task_idx_by_name:
+            return self._task_idx_by_name[task_name_clean]
         
-        # 操船能力
-        if task.get('navigation_required', 1) >= 3:  # 操船が必要
-            nav_ability = person['navigation']
-            if nav_ability > 0:
-                score += 10 + nav_ability * 2
-            else:
-                score -= 30  # 操船できない場合は大きなペナルティ
+        # 部分一致を試行（DB名がタスク名に含まれる、またはその逆）
+        if len(self._task_name_arr) > 0:
+            mask = (np.char.find(task_name_clean, self._task_name_arr) >= 0) | \
+                (np.char.find(self._task_name_arr, task_name_clean) >= 0)
+            hits = np.flatnonzero(mask)
+            if len(hits) > 0:
+                return int(hits[0])
         
-        return score
+        return -1
     
-    def is_person_available(self, person: pd.Series, date_str: str) -> bool:
+    def match_task(self, task_name: str) -> Dict[str, Any]:
         """
-        作業者が指定日に作業可能かチェック
+        スケジュールのタスク名をデータベースとマッチング
+        マッチしない場合はマスタ未登録業務のデフォルト値を返す
         """
-        notes = str(person.get('notes', ''))
-        
-        # 「分析優先」の作業者は割り当て可能だが優先度を下げる
-        # ここでは利用可能として返す
+        task_name_clean = task_name.strip()
+        t_global = self._match_index(task_name_clean)
+        if t_global >= 0:
+            return dict(self._task_records[t_global])
+        return unregistered_task(task_name_clean)
+    
+    def task_scores(self, task_name: str, task: Dict) -> np.ndarray:
+        """
+        全作業者の指定業務に対するマッチングスコア (n_persons,)
+        データベース登録済みの業務は事前計算した行列から取得する
+        """
+        t_global = self._match_index(task_name.strip())
+        if t_global >= 0:
+            return self._score_mat[:, t_global]
+        return match_score_matrix(self._p_attrs, self._task_attrs([task]))[:, 0]
         
-        # 「月火のみ可能」のチェック
-        if '月火のみ' in notes:
-            from datetime import datetime
-            date = datetime.strptime(date_str, '%Y-%m-%d')
-            weekday = date.weekday()
-            if weekday not in [0, 1]:  # 月曜=0, 火曜=1
-                return False
+    def calculate_match_score(self, person: pd.Series, task: Dict) -> float:
+        """
+        作業者と業務のマッチングスコアを計算
+        スコアが高いほど適任
+        """
+        person_attrs = np.array(
+            [[person['skill'], person['strength'], person['ship'], person['navigation']]],
+            dtype=np.float32
+        )
+        return float(match_score_matrix(person_attrs, self._task_attrs([task]))[0, 0])
+    
+    def is_person_available(self, p_idx: int, date_str: str) -> bool:
+        """
+        作業者が指定日に作業可能かチェック
+        判定ルールは availability_matrix に一本化している
         
-        return True
+        Args:
+            p_idx: 作業者の位置（persons_dfの行番号）
+        """
+        return bool(self.availability_matrix([date_str])[0, p_idx])
     
-    def get_priority_penalty(self, person: pd.Series) -> float:
+    def get_priority_penalty(self, p_idx: int) -> float:
         """
         作業者の優先度に基づくペナルティを取得
         分析優先の作業者にはペナルティを付与
+        
+        Args:
+            p_idx: 作業者の位置（persons_dfの行番号）
         """
-        notes = str(person.get('notes', ''))
-        if '分析優先' in notes:
+        if self.p_analysis_priority[p_idx]:
             return -20  # 分析優先の作業者はサンプリングへの割り当てを減らす
         return 0
     
-    def optimize_day(self, date_str: str, task_list: List[str]) -> Dict[str, List[str]]:
+    def availability_matrix(self, dates: List[str]) -> np.ndarray:
+        """
+        日付×作業者の作業可否を一括計算
+        
+        Args:
+            dates: 日付のリスト (YYYY-MM-DD形式)
+            
+        Returns:
+            (n_dates, n_persons) のbool配列
+        """
+        date_weekdays = np.array(
+            [datetime.strptime(date_str, '%Y-%m-%d').weekday() for date_str in dates],
+            dtype=np.int8
+        ).reshape(len(dates), 1)
+        # 「月火のみ可能」の作業者は月曜=0, 火曜=1のみ作業可能
+        return np.where(self.p_monday_tuesday_only[None, :], date_weekdays < 2, True)
+    
+    def optimize_day(self, date_str: str, task_list: List[str],
+                     available: Optional[np.ndarray] = None) -> Dict[str, List[str]]:
         """
         1日分の最適化を実行
         
         Args:
             date_str: 対象日付 (YYYY-MM-DD形式)
             task_list: その日に実行する業務名のリスト
+            available: 作業者ごとの作業可否 (Noneの場合はdate_strから判定)
             
         Returns:
             Dict[task_name, List[person_name]]: 各業務に割り当てられた作業者
@@ -104,15 +221,14 @@ class SamplingOptimizer:
         # 業務情報を取得
         tasks_info = []
         for task_name in task_list:
-            task_info = match_task_to_database(task_name, self.tasks)
+            task_info = self.match_task(task_name)
             task_info['original_name'] = task_name
             tasks_info.append(task_info)
         
-        # 利用可能な作業者を取得
-        available_persons = []
-        for _, person in self.persons.iterrows():
-            if self.is_person_available(person, date_str):
-                available_persons.append(person)
+        # 利用可能な作業者の位置を取得
+        if available is None:
+            available = self.availability_matrix([date_str])[0]
+        available_persons = np.flatnonzero(available).tolist()
         
         if not available_persons:
             return {task['original_name']: [] for task in tasks_info}
@@ -125,94 +241,191 @@ class SamplingOptimizer:
                 area_tasks[area] = []
             area_tasks[area].append(t_idx)
         
-        # 最適化問題の定義
-        prob = pulp.LpProblem(f"Sampling_Assignment_{date_str}", pulp.LpMaximize)
+        # 最適化問題の定義（列番号: x[p,t] = p * n_tasks + t、z[p,area] はその後ろに追加）
+        n_persons = len(available_persons)
+        n_tasks = len(tasks_info)
+        n_cols = n_persons * n_tasks
         
         # 決定変数: x[p,t] = 作業者pが業務tに割り当てられる場合1
-        x = {}
-        for p_idx, person in enumerate(available_persons):
-            for t_idx, task in enumerate(tasks_info):
-                x[p_idx, t_idx] = pulp.LpVariable(
-                    f"x_{p_idx}_{t_idx}", 
-                    cat=pulp.LpBinary
-                )
-        
-        # エリア用変数: y[p,area] = 作業者pがエリアareaの業務に割り当てられる場合1
-        y = {}
-        for p_idx in range(len(available_persons)):
-            for area in area_tasks.keys():
-                area_safe = str(area).replace(' ', '_').replace('・', '_').replace('　', '_')
-                y[p_idx, area] = pulp.LpVariable(
-                    f"y_{p_idx}_{area_safe}",
-                    cat=pulp.LpBinary
-                )
+        def x(p_idx: int, t_idx: int) -> int:
+            return p_idx * n_tasks + t_idx
         
-        # 目的関数: マッチングスコアの最大化
-        objective = []
-        for p_idx, person in enumerate(available_persons):
-            for t_idx, task in enumerate(tasks_info):
-                score = self.calculate_match_score(person, task)
-                score += self.get_priority_penalty(person)
-                objective.append(score * x[p_idx, t_idx])
+        # エリア用変数: z[p,area] = 作業者pがエリアareaの業務に割り当てられる場合1
+        # 業務が1件のエリアはx自体が指標になるため、2件以上のエリアのみ作成する
+        area_indicator = {}
+        if len(area_tasks) > 1:
+            for area, t_indices in area_tasks.items():
+                for p_idx in range(n_persons):
+                    if len(t_indices) == 1:
+                        area_indicator[p_idx, area] = x(p_idx, t_indices[0])
+                    else:
+                        area_indicator[p_idx, area] = n_cols
+                        n_cols += 1
         
-        prob += pulp.lpSum(objective)
+        # 目的関数: マッチングスコアの最大化
+        costs = np.zeros(n_cols)
+        task_scores = [self.task_scores(task['original_name'], task) for task in tasks_info]
+        for p_idx, p_global in enumerate(available_persons):
+            penalty = self.get_priority_penalty(p_global)
+            for t_idx in range(n_tasks):
+                costs[x(p_idx, t_idx)] = float(task_scores[t_idx][p_global]) + penalty
         
-        # 制約1: 各作業者は1つのエリアの業務のみに従事可能
-        for p_idx in range(len(available_persons)):
-            prob += pulp.lpSum([y[p_idx, area] for area in area_tasks.keys()]) <= 1
+        # 制約は (列番号のリスト, 係数のリスト, 上限) で表す
+        rows = []
         
-        # 制約2: 作業者がエリアに割り当てられた場合のみ、そのエリアの業務に従事可能
-        for p_idx in range(len(available_persons)):
-            for area, t_indices in area_tasks.items():
-                for t_idx in t_indices:
-                    prob += x[p_idx, t_idx] <= y[p_idx, area]
+        # 制約1: 各作業者は1つのエリアの業務のみに従事可能（エリアが複数ある日のみ）
+        if area_indicator:
+            for p_idx in range(n_persons):
+                cols = [area_indicator[p_idx, area] for area in area_tasks.keys()]
+                rows.append((cols, [1.0] * len(cols), 1))
+            
+            # 制約2: 作業者がエリアに割り当てられた場合のみ、そのエリアの業務に従事可能
+            for p_idx in range(n_persons):
+                for area, t_indices in area_tasks.items():
+                    if len(t_indices) > 1:
+                        cols = [x(p_idx, t_idx) for t_idx in t_indices] + [area_indicator[p_idx, area]]
+                        rows.append((cols, [1.0] * len(t_indices) + [-float(len(t_indices))], 0))
         
         # 制約3: 各業務に必要人数を割り当て（可能な限り）
         for t_idx, task in enumerate(tasks_info):
             required = task.get('required_workers', 1)  # デフォルト1名
-            prob += pulp.lpSum([x[p_idx, t_idx] for p_idx in range(len(available_persons))]) <= required
+            rows.append(([x(p_idx, t_idx) for p_idx in range(n_persons)], [1.0] * n_persons, required))
         
-        # 求解
-        prob.solve(pulp.PULP_CBC_CMD(msg=0))
+        # 求解（HiGHSが利用可能ならプロセス内で解き、なければCBCを使用）
+        if highspy is not None:
+            solution = self._solve_highs(costs, rows)
+        else:
+            solution = self._solve_pulp(costs, rows, date_str)
         
         # 結果の取得
         result = {task['original_name']: [] for task in tasks_info}
         
-        if prob.status == pulp.LpStatusOptimal:
-            for p_idx, person in enumerate(available_persons):
+        if solution is not None:
+            for p_idx, p_global in enumerate(available_persons):
                 for t_idx, task in enumerate(tasks_info):
-                    if x[p_idx, t_idx].value() > 0.5:
-                        result[task['original_name']].append(person['name'])
+                    if solution[x(p_idx, t_idx)] > 0.5:
+                        result[task['original_name']].append(self.p_names[p_global])
         
         return result
     
-    def optimize_schedule(self, schedule_df: pd.DataFrame) -> Dict[str, Dict[str, List[str]]]:
+    @staticmethod
+    def _solve_highs(costs: np.ndarray, rows: List[Tuple[List[int], List[float], float]]) -> Optional[np.ndarray]:
+        """
+        0-1整数計画問題（最大化）をhighspyで求解
+        
+        Returns:
+            各変数の値（最適解が得られなかった場合はNone）
+        """
+        n_cols = len(costs)
+        h = highspy.Highs()
+        h.setOptionValue('output_flag', False)
+        
+        h.addVars(n_cols, np.zeros(n_cols), np.ones(n_cols))
+        col_indices = np.arange(n_cols, dtype=np.int32)
+        h.changeColsIntegrality(n_cols, col_indices, np.full(n_cols, highspy.HighsVarType.kInteger))
+        h.changeColsCost(n_cols, col_indices, costs)
+        h.changeObjectiveSense(highspy.ObjSense.kMaximize)
+        
+        if rows:
+            starts = np.cumsum([0] + [len(cols) for cols, _, _ in rows[:-1]], dtype=np.int32)
+            indices = np.array([c for cols, _, _ in rows for c in cols], dtype=np.int32)
+            values = np.array([v for _, vals, _ in rows for v in vals], dtype=np.float64)
+            h.addRows(
+                len(rows),
+                np.full(len(rows), -highspy.kHighsInf),
+                np.array([upper for _, _, upper in rows], dtype=np.float64),
+                len(indices), starts, indices, values
+            )
+        
+        h.run()
+        if h.getModelStatus() != highspy.HighsModelStatus.kOptimal:
+            return None
+        return np.asarray(h.getSolution().col_value)
+    
+    @staticmethod
+    def _solve_pulp(costs: np.ndarray, rows: List[Tuple[List[int], List[float], float]],
+                    date_str: str) -> Optional[np.ndarray]:
+        """
+        0-1整数計画問題（最大化）をPuLP + CBCで求解（highspy未インストール時のフォールバック）
+        
+        Returns:
+            各変数の値（最適解が得られなかった場合はNone）
+        """
+        prob = pulp.LpProblem(f"Sampling_Assignment_{date_str}", pulp.LpMaximize)
+        # 変数名は列番号のみとし、式は (変数, 係数) の組から直接組み立てる
+        v = [pulp.LpVariable(f"v{col}", cat=pulp.LpBinary) for col in range(len(costs))]
+        
+        prob += pulp.LpAffineExpression(zip(v, costs.tolist()))
+        for cols, vals, upper in rows:
+            prob += pulp.LpConstraint(
+                pulp.LpAffineExpression([(v[col], val) for col, val in zip(cols, vals)]),
+                sense=pulp.LpConstraintLE,
+                rhs=upper
+            )
+        
+        prob.solve(pulp.PULP_CBC_CMD(msg=0))
+        
+        if prob.status != pulp.LpStatusOptimal:
+            return None
+        return np.array([var.value() for var in v])
+    
+    def optimize_schedule(self, schedule_df: pd.DataFrame,
+                          max_workers: Optional[int] = None) -> Dict[str, Dict[str, List[str]]]:
         """
         全スケジュールの最適化を実行
+        各日の問題は独立しているため、複数プロセスで並列に求解する
+        
+        Args:
+            schedule_df: スケジュールデータ
+            max_workers: 並列プロセス数 (Noneの場合はCPU数、1の場合は逐次実行)
+                Webリクエスト内など、プロセスを生成すべきでない場合は1を指定する
         
         Returns:
             Dict[date_str, Dict[task_name, List[person_name]]]
         """
         schedule_by_date = get_schedule_by_date(schedule_df)
+        dates = list(schedule_by_date.keys())
+        task_lists = [schedule_by_date[date_str] for date_str in dates]
+        availability = self.availability_matrix(dates)
         
-        all_results = {}
-        for date_str, task_list in schedule_by_date.items():
-            day_result = self.optimize_day(date_str, task_list)
-            all_results[date_str] = day_result
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+        max_workers = min(max_workers, len(dates))
+        
+        if max_workers <= 1:
+            day_results = map(self.optimize_day, dates, task_lists, availability)
+        else:
+            # 業務名のマッチングを済ませてから各プロセスに渡す（キャッシュを共有するため）
+            for task_list in task_lists:
+                for task_name in task_list:
+                    self._match_index(task_name.strip())
+            chunksize = max(1, len(dates) // (max_workers * 4))
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                day_results = list(executor.map(self.optimize_day, dates, task_lists, availability, chunksize=chunksize))
         
-        return all_results
+        return dict(zip(dates, day_results))
 
 
-def run_optimization(optimization_file: str, schedule_file: str) -> Dict:
+def run_optimization(persons_df: Optional[pd.DataFrame] = None,
+                     tasks_df: Optional[pd.DataFrame] = None,
+                     schedule_df: Optional[pd.DataFrame] = None,
+                     optimization_file: Optional[str] = None,
+                     schedule_file: Optional[str] = None,
+                     max_workers: Optional[int] = None) -> Dict:
     """
     最適化を実行するメイン関数
+    読み込み済みのDataFrameが渡されない場合はファイルから読み込む
+    max_workers は SamplingOptimizer.optimize_schedule に渡す並列プロセス数
     """
     # データ読み込み
-    persons_df, tasks_df, schedule_df = load_all_data(optimization_file, schedule_file)
+    if persons_df is None or tasks_df is None or schedule_df is None:
+        if optimization_file is None or schedule_file is None:
+            raise ValueError('DataFrameまたはファイルパスを指定してください')
+        persons_df, tasks_df, schedule_df = load_all_data(optimization_file, schedule_file)
     
     # 最適化実行
     optimizer = SamplingOptimizer(persons_df, tasks_df)
-    results = optimizer.optimize_schedule(schedule_df)
+    results = optimizer.optimize_schedule(schedule_df, max_workers=max_workers)
     
     return {
         'results': results,
@@ -227,8 +440,8 @@ if __name__ == '__main__':
     sys.stdout.reconfigure(encoding='utf-8')
     
     result = run_optimization(
-        'Mathematical Optimization_sampling_2026.xlsx',
-        'sample.xlsx'
+        optimization_file='Mathematical Optimization_sampling_2026.xlsx',
+        schedule_file='sample.xlsx'
     )
     
     print("=== 最適化結果 ===")